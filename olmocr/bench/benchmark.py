@@ -13,13 +13,13 @@ The final score is averaged over the repeated generations.
 
 import argparse
 import glob
-import itertools
 import json
+import multiprocessing
 import os
 import sys
+from pathlib import Path
 
-from fuzzysearch import find_near_matches
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 
 
 def validate_jsonl_file(jsonl_path: str, all_pdf_files: list[str]):
@@ -27,109 +27,160 @@ def validate_jsonl_file(jsonl_path: str, all_pdf_files: list[str]):
     Validate a .jsonl file line by line to ensure each line is valid JSON
     and has the expected fields for the rules.
     """
-    all_pdf_basenames = [os.path.basename(p) for p in all_pdf_files]
+    # Set rather than list: membership is checked once per rule below.
+    all_pdf_basenames = {os.path.basename(p) for p in all_pdf_files}
 
     rules = []
     rule_ids = set()
-    with open(jsonl_path, "r", encoding="utf-8") as f:
-        for line_num, line in enumerate(f, start=1):
-            line = line.strip()
-            if not line:
-                # Skip blank lines
-                continue
-            try:
-                data = json.loads(line)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON on line {line_num} in {jsonl_path}: {e}")
-
-            # Basic checks to ensure required keys exist (pdf, id, type, etc.)
-            if "pdf" not in data or "id" not in data or "type" not in data:
-                raise ValueError(f"Missing required fields in line {line_num} of {jsonl_path}: {data}")
-
-            rule_id = data["id"]
-            if rule_id in rule_ids:
-                raise ValueError(f"Duplicate rule {rule_id} in {jsonl_path}")
-            else:
-                rule_ids.add(rule_id)
-
-            # Make sure the referenced PDF exists
-            if data["pdf"] not in all_pdf_basenames:
-                raise ValueError(f"Missing pdf {data['pdf']} referenced by {rule_id} in {jsonl_path} line {line_num}")
-
-            # Additional validations depending on rule type
-            rule_type = data["type"]
-            if rule_type in ("present", "absent"):
-                if "text" not in data:
-                    raise ValueError(f"'text' field required for rule type '{rule_type}' in {jsonl_path} line {line_num}")
-            elif rule_type == "order":
-                if "before" not in data:
-                    raise ValueError(f"'before' field required for rule type 'order' in {jsonl_path} line {line_num}")
-                if len(data["before"]) < 10:
-                    raise ValueError(f"'before' field too short in {jsonl_path} line {line_num}")
-                if "after" not in data:
-                    raise ValueError(f"'after' field required for rule type 'order' in {jsonl_path} line {line_num}")
-                if len(data["after"]) < 10:
-                    raise ValueError(f"'after' field too short in {jsonl_path} line {line_num}")
-            else:
-                raise ValueError(f"Unknown rule type '{rule_type}' in {jsonl_path} line {line_num}")
+    # Read the whole file in one buffered call and split in memory; rule files are small and this
+    # avoids per-line iteration through the file object.
+    text = Path(jsonl_path).read_text(encoding="utf-8")
+    for line_num, line in enumerate(text.splitlines(), start=1):
+        # Skip blank lines; json.loads tolerates surrounding whitespace itself, so there is no
+        # need to allocate a stripped copy of every line.
+        if not line or line.isspace():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_num} in {jsonl_path}: {e}")
+
+        # Basic checks to ensure required keys exist (pdf, id, type, etc.)
+        if "pdf" not in data or "id" not in data or "type" not in data:
+            raise ValueError(f"Missing required fields in line {line_num} of {jsonl_path}: {data}")
 
-            rules.append(data)
+        rule_id = data["id"]
+        if rule_id in rule_ids:
+            raise ValueError(f"Duplicate rule {rule_id} in {jsonl_path}")
+        else:
+            rule_ids.add(rule_id)
+
+        # Make sure the referenced PDF exists
+        if data["pdf"] not in all_pdf_basenames:
+            raise ValueError(f"Missing pdf {data['pdf']} referenced by {rule_id} in {jsonl_path} line {line_num}")
+
+        # Additional validations depending on rule type
+        rule_type = data["type"]
+        if rule_type in ("present", "absent"):
+            if "text" not in data:
+                raise ValueError(f"'text' field required for rule type '{rule_type}' in {jsonl_path} line {line_num}")
+        elif rule_type == "order":
+            if "before" not in data:
+                raise ValueError(f"'before' field required for rule type 'order' in {jsonl_path} line {line_num}")
+            if len(data["before"]) < 10:
+                raise ValueError(f"'before' field too short in {jsonl_path} line {line_num}")
+            if "after" not in data:
+                raise ValueError(f"'after' field required for rule type 'order' in {jsonl_path} line {line_num}")
+            if len(data["after"]) < 10:
+                raise ValueError(f"'after' field too short in {jsonl_path} line {line_num}")
+        else:
+            raise ValueError(f"Unknown rule type '{rule_type}' in {jsonl_path} line {line_num}")
+
+        rules.append(data)
     return rules
 
 
-def run_rule(rule, md_file_path: str) -> (bool, str):
+def ratio_rule_result(rule, best_ratio: float) -> (bool, str):
     """
-    Run the given rule on the content of the provided .md file.
-    Returns a tuple (passed, explanation) where 'passed' is True if the rule passes,
-    and 'explanation' is a short message explaining the failure when the rule does not pass.
+    Shared pass/fail decision for present/absent rules given a partial ratio in [0, 1].
     """
-    try:
-        with open(md_file_path, "r", encoding="utf-8") as f:
-            md_content = f.read()
-    except Exception as e:
-        return (False, f"Error reading {md_file_path}: {e}")
-
-    rule_type = rule["type"]
-
-    if rule_type in ("present", "absent"):
-        reference_query = rule["text"]
-        threshold = rule.get("threshold", 1.0)
-        best_ratio = fuzz.partial_ratio(reference_query, md_content) / 100.0
-        if rule_type == "present":
-            if best_ratio >= threshold:
-                return (True, "")
-            else:
-                return (False, f"Expected '{reference_query[:40]}...' with threshold {threshold} but best match ratio was {best_ratio:.3f}")
-        else:  # absent
-            if best_ratio < threshold:
-                return (True, "")
-            else:
-                return (False, f"Expected '{reference_query[:40]}...' with threshold {threshold} but best match ratio was {best_ratio:.3f}")
-    elif rule_type == "order":
-        before = rule.get("before")
-        after = rule.get("after")
-        threshold = rule.get("threshold", 1.0)
-        max_l_dist = round((1.0 - threshold) * len(before))
-        before_matches = find_near_matches(before, md_content, max_l_dist=max_l_dist)
-        after_matches = find_near_matches(after, md_content, max_l_dist=max_l_dist)
-        if not before_matches:
-            return (False, f"'before' search text '{before[:40]}...' not found with max_l_dist {max_l_dist}")
-        if not after_matches:
-            return (False, f"'after' search text '{after[:40]}...' not found with max_l_dist {max_l_dist}")
-        for before_match, after_match in itertools.product(before_matches, after_matches):
-            if before_match.start < after_match.start:
-                return (True, "")
-        return (False, f"Could not find a location where '{before[:40]}...' appears before '{after[:40]}...'.")
-    else:
-        raise NotImplementedError(f"Rule type '{rule_type}' is not implemented.")
-
-
-def evaluate_candidate(candidate_folder: str, all_rules: list, pdf_basenames: list[str]):
+    threshold = rule.get("threshold", 1.0)
+    if rule["type"] == "present":
+        passed = best_ratio >= threshold
+    else:  # absent
+        passed = best_ratio < threshold
+    if passed:
+        return (True, "")
+    return (False, f"Expected '{rule['text'][:40]}...' with threshold {threshold} but best match ratio was {best_ratio:.3f}")
+
+
+def bounded_substr_search(pattern: str, text: str, score_cutoff: float):
+    """
+    Find the best approximate occurrence of pattern in text using rapidfuzz's bit-parallel
+    matcher. Returns the ScoreAlignment (with dest_start/dest_end into text) when the partial
+    ratio reaches score_cutoff, or None otherwise. Single entry point for every bounded
+    substring search in the benchmark.
+    """
+    return fuzz.partial_ratio_alignment(pattern, text, processor=None, score_cutoff=score_cutoff)
+
+
+def run_order_check(before: str, after: str, threshold: float, score_cutoff: float, md_content: str) -> (bool, str):
+    """
+    Run an order rule: passes when an acceptable 'after' match starts past a 'before' match.
+    Taking the patterns and cutoff as arguments lets callers bind them once per rule and reuse
+    them across every md repeat.
+    """
+    before_align = bounded_substr_search(before, md_content, score_cutoff)
+    if before_align is None:
+        return (False, f"'before' search text '{before[:40]}...' not found with threshold {threshold}")
+    # An 'after' match starting past the best 'before' match proves the ordering.
+    if bounded_substr_search(after, md_content[before_align.dest_start + 1 :], score_cutoff) is not None:
+        return (True, "")
+    after_align = bounded_substr_search(after, md_content, score_cutoff)
+    if after_align is None:
+        return (False, f"'after' search text '{after[:40]}...' not found with threshold {threshold}")
+    # The alignments above are the *best*-scoring matches, not the earliest or latest acceptable
+    # ones, so a valid ordering can still exist with a weaker 'before' match ahead of the best
+    # 'after' match; check the complementary prefix before declaring the rule failed.
+    if bounded_substr_search(before, md_content[: after_align.dest_start], score_cutoff) is not None:
+        return (True, "")
+    return (False, f"Could not find a location where '{before[:40]}...' appears before '{after[:40]}...'.")
+
+
+def load_candidate_md_files(candidate_folder: str, pdf_basenames: list[str]):
+    """
+    Discover and read the MD repeats for every PDF in the candidate folder.
+
+    Returns a tuple (pdf_to_md_files, md_contents, errors):
+      - pdf_to_md_files: Mapping of pdf basename to its md repeat paths, shortest file first.
+      - md_contents: Mapping of md path to its decoded content.
+      - errors: Missing-repeat or read errors; when non-empty the other two are not usable.
+
+    Scan the candidate folder once and bucket the .md files by their base name (the part before
+    the trailing _<repeat> suffix), rather than running one glob pass per pdf. The contents are
+    read here exactly once so they can be cached across the whole evaluation.
+    """
+    errors = []
+    candidate_name = os.path.basename(candidate_folder)
+
+    md_files_by_base = {}
+    for entry in os.scandir(candidate_folder):
+        if entry.name.endswith(".md"):
+            base = entry.name[: -len(".md")].rsplit("_", 1)[0]
+            md_files_by_base.setdefault(base, []).append(entry.path)
+
+    pdf_to_md_files = {}
+    for pdf_name in pdf_basenames:
+        md_base = os.path.splitext(pdf_name)[0]
+        md_files = md_files_by_base.get(md_base, [])
+        if not md_files:
+            errors.append(f"Candidate '{candidate_name}' is missing MD repeats for {pdf_name} (expected files matching {md_base}_*.md).")
+        else:
+            # Process shortest repeats first so cheap early matches resolve before the long scans.
+            md_files.sort(key=os.path.getsize)
+            pdf_to_md_files[pdf_name] = md_files
+
+    md_contents = {}
+    if not errors:
+        for md_files in pdf_to_md_files.values():
+            for md_path in md_files:
+                try:
+                    md_contents[md_path] = Path(md_path).read_text(encoding="utf-8")
+                except Exception as e:
+                    errors.append(f"Error reading {md_path}: {e}")
+
+    return (pdf_to_md_files, md_contents, errors)
+
+
+def evaluate_candidate(candidate_folder: str, all_rules: list, pdf_basenames: list[str], md_cache=None):
     """
     For the candidate folder (pipeline tool output), validate that it contains at least one .md file
     (i.e. repeated generations like _1.md, _2.md, etc.) for every PDF in the pdf folder.
     Then, run each rule against all corresponding .md files and average the results.
 
+    md_cache optionally carries a precomputed load_candidate_md_files result for this candidate,
+    so callers evaluating many candidates can hoist the file reads out of the rule loop.
+
     Returns a tuple:
       (overall_score, total_rules, candidate_errors, rule_failures, rule_type_breakdown)
 
@@ -137,53 +188,85 @@ def evaluate_candidate(candidate_folder: str, all_rules: list, pdf_basenames: li
       - total_rules: Total number of rules evaluated.
       - candidate_errors: List of candidate errors (e.g. missing files).
       - rule_failures: List of failure messages for rules not passing on all repeats.
-      - rule_type_breakdown: Dictionary mapping rule type to list of average pass ratios for rules of that type.
+      - rule_type_breakdown: Dictionary mapping rule type to (score_sum, rule_count) running
+        totals over the average pass ratios of rules of that type.
     """
-    candidate_errors = []
     rule_failures = []
-    rule_type_breakdown = {}  # key: rule type, value: list of average pass ratios
-    candidate_name = os.path.basename(candidate_folder)
+    rule_type_breakdown = {}  # key: rule type, value: (score_sum, rule_count) running totals
 
-    # Map each PDF to its corresponding MD repeats (e.g., doc1_1.md, doc1_2.md, etc.)
-    pdf_to_md_files = {}
-    for pdf_name in pdf_basenames:
-        md_base = os.path.splitext(pdf_name)[0]
-        md_pattern = os.path.join(candidate_folder, f"{md_base}_*.md")
-        md_files = glob.glob(md_pattern)
-        if not md_files:
-            candidate_errors.append(f"Candidate '{candidate_name}' is missing MD repeats for {pdf_name} (expected files matching {md_base}_*.md).")
-        else:
-            pdf_to_md_files[pdf_name] = md_files
+    if md_cache is None:
+        md_cache = load_candidate_md_files(candidate_folder, pdf_basenames)
+    pdf_to_md_files, md_contents, load_errors = md_cache
+    # Copy so that rule errors appended below never mutate a cache shared across candidates.
+    candidate_errors = list(load_errors)
 
     if candidate_errors:
         return (0.0, len(all_rules), candidate_errors, rule_failures, rule_type_breakdown)
 
     total_rule_score = 0.0
 
-    # Evaluate each rule. Each rule references a PDF (e.g., "doc1.pdf") so we get all its MD repeats.
-    for rule in all_rules:
-        rule_type = rule["type"]
-        if rule_type not in rule_type_breakdown:
-            rule_type_breakdown[rule_type] = []
-        pdf_name = rule["pdf"]
-        md_base = os.path.splitext(pdf_name)[0]
+    # Each rule references a PDF (e.g., "doc1.pdf") and is checked against every one of its MD repeats.
+    # All present/absent rules for a given repeat are scored in a single process.cdist call, which
+    # amortizes the per-call overhead and releases the GIL internally (workers=-1 fans the scoring
+    # out over all cores). This replaces the per-rule process pool, with no pickling of md contents.
+    # Order rules need match positions rather than scores, so they go through run_order_check.
+    rules_by_pdf = {}
+    for rule_index, rule in enumerate(all_rules):
+        rules_by_pdf.setdefault(rule["pdf"], []).append(rule_index)
+
+    results_by_rule = {}
+    for pdf_name, rule_indices in rules_by_pdf.items():
         md_files = pdf_to_md_files.get(pdf_name, [])
         if not md_files:
             continue  # Should not occur due to earlier check.
-        repeat_passes = 0
-        num_repeats = 0
-        explanations = []
-        for md_path in md_files:
-            num_repeats += 1
-            try:
-                passed, explanation = run_rule(rule, md_path)
-                if passed:
-                    repeat_passes += 1
+        scored_indices = [i for i in rule_indices if all_rules[i]["type"] in ("present", "absent")]
+        order_indices = [i for i in rule_indices if all_rules[i]["type"] == "order"]
+        for rule_index in rule_indices:
+            results_by_rule[rule_index] = []
+        for md_path in md_files if scored_indices else []:
+            md_content = md_contents[md_path]
+            # Settle what an exact substring check can decide before batching: an exact hit means
+            # a partial ratio of 1.0, and a miss fully decides absent rules at threshold 1.0,
+            # since only an exact hit can score 1.0. Only the rules left undecided go to cdist.
+            pending = []
+            for rule_index in scored_indices:
+                rule = all_rules[rule_index]
+                if rule["text"] in md_content:
+                    results_by_rule[rule_index].append(ratio_rule_result(rule, 1.0))
+                elif rule["type"] == "absent" and rule.get("threshold", 1.0) >= 1.0:
+                    results_by_rule[rule_index].append((True, ""))
                 else:
-                    explanations.append(explanation)
-            except Exception as e:
-                candidate_errors.append(f"Error running rule {rule.get('id')} on {md_path}: {e}")
-                explanations.append(str(e))
+                    pending.append(rule_index)
+            if pending:
+                scores = process.cdist([all_rules[i]["text"] for i in pending], [md_content], scorer=fuzz.partial_ratio, workers=-1)
+                for rule_index, score in zip(pending, scores[:, 0]):
+                    results_by_rule[rule_index].append(ratio_rule_result(all_rules[rule_index], float(score) / 100.0))
+        # Order rules iterate with the rule in the outer loop so the before/after patterns and
+        # cutoff are bound once and reused across all md repeats.
+        for rule_index in order_indices:
+            rule = all_rules[rule_index]
+            before = rule.get("before")
+            after = rule.get("after")
+            threshold = rule.get("threshold", 1.0)
+            score_cutoff = threshold * 100
+            for md_path in md_files:
+                try:
+                    results_by_rule[rule_index].append(run_order_check(before, after, threshold, score_cutoff, md_contents[md_path]))
+                except Exception as e:
+                    candidate_errors.append(f"Error running rule {rule.get('id')} on {md_path}: {e}")
+                    results_by_rule[rule_index].append((False, str(e)))
+
+    for rule_index, rule in enumerate(all_rules):
+        rule_type = rule["type"]
+        if rule_type not in rule_type_breakdown:
+            rule_type_breakdown[rule_type] = (0.0, 0)
+        md_base = os.path.splitext(rule["pdf"])[0]
+        repeat_results = results_by_rule.get(rule_index)
+        if not repeat_results:
+            continue  # Should not occur due to earlier check.
+        repeat_passes = sum(1 for passed, _ in repeat_results if passed)
+        num_repeats = len(repeat_results)
+        explanations = [explanation for passed, explanation in repeat_results if not passed]
         rule_avg = repeat_passes / num_repeats if num_repeats > 0 else 0.0
         total_rule_score += rule_avg
         if rule_avg < 1.0:
@@ -191,12 +274,36 @@ def evaluate_candidate(candidate_folder: str, all_rules: list, pdf_basenames: li
                 f"Rule {rule.get('id')} on {md_base} average pass ratio: {rule_avg:.3f} ({repeat_passes}/{num_repeats} repeats passed). "
                 f"Example explanation: {explanations[0] if explanations else 'No explanation'}"
             )
-        rule_type_breakdown[rule_type].append(rule_avg)
+        score_sum, rule_count = rule_type_breakdown[rule_type]
+        rule_type_breakdown[rule_type] = (score_sum + rule_avg, rule_count + 1)
 
     overall_score = total_rule_score / len(all_rules) if all_rules else 0.0
     return (overall_score, len(all_rules), candidate_errors, rule_failures, rule_type_breakdown)
 
 
+_worker_state = {}
+
+
+def _init_candidate_worker(all_rules: list, pdf_basenames: list[str], candidate_md_caches: dict):
+    """
+    Pool initializer: candidates share the rule set, pdf list, and preloaded md contents
+    read-only, so ship them to each worker once here instead of pickling them into every
+    evaluate_candidate task.
+    """
+    _worker_state["all_rules"] = all_rules
+    _worker_state["pdf_basenames"] = pdf_basenames
+    _worker_state["candidate_md_caches"] = candidate_md_caches
+
+
+def _evaluate_candidate_worker(candidate_folder: str):
+    return evaluate_candidate(
+        candidate_folder,
+        _worker_state["all_rules"],
+        _worker_state["pdf_basenames"],
+        md_cache=_worker_state["candidate_md_caches"].get(candidate_folder),
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run OLMOCR Bench.")
     parser.add_argument(
@@ -254,12 +361,22 @@ def main():
         print("Error: No candidate pipeline folders found (subdirectories besides 'pdfs').", file=sys.stderr)
         sys.exit(1)
 
-    # Evaluate each candidate
-    summary = []
+    # Load every candidate's md repeats once up front; the contents reach the pool workers
+    # through the initializer rather than being re-read (or re-pickled) per task.
+    candidate_md_caches = {candidate: load_candidate_md_files(candidate, pdf_basenames) for candidate in candidate_folders}
+
+    # Evaluate the candidates in parallel; they are independent of each other.
     print("\nRunning rules for each candidate:")
-    for candidate in candidate_folders:
+    with multiprocessing.Pool(
+        processes=min(len(candidate_folders), os.cpu_count()),
+        initializer=_init_candidate_worker,
+        initargs=(all_rules, pdf_basenames, candidate_md_caches),
+    ) as pool:
+        candidate_results = pool.map(_evaluate_candidate_worker, candidate_folders)
+
+    summary = []
+    for candidate, (overall_score, total_rules, candidate_errors, rule_failures, rule_type_breakdown) in zip(candidate_folders, candidate_results):
         candidate_name = os.path.basename(candidate)
-        overall_score, total_rules, candidate_errors, rule_failures, rule_type_breakdown = evaluate_candidate(candidate, all_rules, pdf_basenames)
         summary.append((candidate_name, overall_score, total_rules, candidate_errors, rule_failures, rule_type_breakdown))
         print(f"\nCandidate: {candidate_name}")
         if candidate_errors:
@@ -281,12 +398,12 @@ def main():
             status = f"{overall_score * 100:0.1f}%"
         print(f"{candidate_name:20s} : Average Score: {overall_score * 100:0.1f}% over {total_rules:3d} rules - {status}")
         print("  Breakdown by rule type:")
-        for rtype, scores in rule_type_breakdown.items():
-            if scores:
-                avg = sum(scores) / len(scores) * 100
+        for rtype, (score_sum, rule_count) in rule_type_breakdown.items():
+            if rule_count:
+                avg = score_sum / rule_count * 100
             else:
                 avg = 0.0
-            print(f"    {rtype:8s}: {avg:0.1f}% average pass rate over {len(scores)} rules")
+            print(f"    {rtype:8s}: {avg:0.1f}% average pass rate over {rule_count} rules")
     print("=" * 50)
 
 